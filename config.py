@@ -1,52 +1,100 @@
 import os
-from typing import List, Tuple
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Mapping, Tuple
+
+# Read the environment once at import instead of going through os.getenv
+# for every setting.
+_env = os.environ.copy()
 
 
 class Config:
 
     # API Server Settings
-    API_HOST = os.getenv("API_HOST", "127.0.0.1")
-    API_PORT = int(os.getenv("API_PORT", "3000"))
-    API_RELOAD = os.getenv("API_RELOAD", "True").lower() == "true"
+    API_HOST = _env.get("API_HOST", "127.0.0.1")
+    API_PORT = int(_env.get("API_PORT", "3000"))
+    API_RELOAD = _env.get("API_RELOAD", "True").lower() == "true"
+    API_WORKERS = int(_env.get("API_WORKERS", "1"))
+    # uvicorn event loop / HTTP parser ("auto" picks uvloop/httptools if installed)
+    API_LOOP = _env.get("API_LOOP", "auto")
+    API_HTTP = _env.get("API_HTTP", "auto")
+    # permessage-deflate makes uvicorn compress every broadcast frame once per
+    # client; the pump frames are small, so it is off unless asked for
+    WS_PER_MESSAGE_DEFLATE = _env.get("WS_PER_MESSAGE_DEFLATE", "False").lower() == "true"
+    # Comma-separated list; empty disables CORS (e.g. handled by a reverse proxy)
+    CORS_ORIGINS = tuple(
+        origin.strip()
+        for origin in _env.get("CORS_ORIGINS", "*").split(",")
+        if origin.strip()
+    )
 
-    DEFAULT_BAUDRATE = int(os.getenv("SERIAL_BAUDRATE", "9600"))
-    DEFAULT_TIMEOUT = float(os.getenv("SERIAL_TIMEOUT", "0.068"))
-    DEFAULT_WRITE_TIMEOUT = float(os.getenv("SERIAL_WRITE_TIMEOUT", "0.068"))
+    DEFAULT_BAUDRATE = int(_env.get("SERIAL_BAUDRATE", "9600"))
+    DEFAULT_TIMEOUT = float(_env.get("SERIAL_TIMEOUT", "0.068"))
+    DEFAULT_WRITE_TIMEOUT = float(_env.get("SERIAL_WRITE_TIMEOUT", "0.068"))
 
     DEFAULT_ADDRESS_RANGE = (
-        int(os.getenv("MIN_PUMP_ADDRESS", "1")),
-        int(os.getenv("MAX_PUMP_ADDRESS", "16")),
+        int(_env.get("MIN_PUMP_ADDRESS", "1")),
+        int(_env.get("MAX_PUMP_ADDRESS", "16")),
     )
-    DISCOVERY_TIMEOUT = float(os.getenv("DISCOVERY_TIMEOUT", "0.068"))
+    DISCOVERY_TIMEOUT = float(_env.get("DISCOVERY_TIMEOUT", "0.068"))
 
-    MONITOR_INTERVAL = int(os.getenv("MONITOR_INTERVAL", "30"))
-    STATUS_HISTORY_SIZE = int(os.getenv("STATUS_HISTORY_SIZE", "100"))
+    MONITOR_INTERVAL = int(_env.get("MONITOR_INTERVAL", "30"))
+    STATUS_HISTORY_SIZE = int(_env.get("STATUS_HISTORY_SIZE", "100"))
 
     # Logging Setings
-    LOG_LEVEL = os.getenv("LOG_LEVEL", "ERROR").upper()
-    LOG_FORMAT = os.getenv(
+    LOG_LEVEL = _env.get("LOG_LEVEL", "ERROR").upper()
+    LOG_FORMAT = _env.get(
         "LOG_FORMAT", "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     )
 
-    MAX_WORKERS = int(os.getenv("MAX_WORKERS", "10"))
+    MAX_WORKERS = int(_env.get("MAX_WORKERS", "10"))
 
-    COMMAND_DELAY = float(os.getenv("COMMAND_DELAY", "0.1"))
-    MAX_RETRIES = int(os.getenv("MAX_RETRIES", "5"))
+    COMMAND_DELAY = float(_env.get("COMMAND_DELAY", "0.1"))
+    MAX_RETRIES = int(_env.get("MAX_RETRIES", "5"))
 
-    COM_PORT = os.getenv("COM_PORT", "")
+    COM_PORT = _env.get("COM_PORT", "")
 
     @classmethod
-    def get_all_settings(cls) -> dict:
-        """Get all configuration settings as a dictionary"""
-        return {
-            key: getattr(cls, key)
-            for key in dir(cls)
-            if not key.startswith("_") and not callable(getattr(cls, key))
-        }
+    def get_all_settings(cls) -> Mapping:
+        """Get all configuration settings as a read-only mapping"""
+        return _SETTINGS_CACHE
+
+    @classmethod
+    def update(cls, **overrides) -> None:
+        """Override settings at runtime (e.g. from CLI arguments)"""
+        for key, value in overrides.items():
+            setattr(cls, key, value)
+        _refresh_settings_cache()
 
-    def dict(self):
+    def dict(self) -> dict:
         """Return settings as dictionary (for compatibility with Pydantic settings)"""
-        return self.get_all_settings()
+        return dict(_SETTINGS_CACHE)
+
+
+def _collect_settings() -> Mapping:
+    return MappingProxyType(
+        {
+            key: value
+            for key, value in vars(Config).items()
+            if not key.startswith("_")
+            and not isinstance(value, (classmethod, staticmethod))
+            and not callable(value)
+        }
+    )
+
+
+def _refresh_settings_cache() -> None:
+    global _SETTINGS_CACHE
+    _SETTINGS_CACHE = _collect_settings()
+
+
+_SETTINGS_CACHE: Mapping = _collect_settings()
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Config:
+    """Return the process-wide settings instance"""
+    return Config()
 
 
-settings = Config()
+settings = get_settings()
@@ -1,16 +1,25 @@
-from fastapi import FastAPI, HTTPException, Query, Path
+from fastapi import Depends, FastAPI, HTTPException, Query, Path, Request
 from fastapi.responses import RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import logging
-from typing import List, Optional
+import logging.config
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional
 from contextlib import asynccontextmanager
 from datetime import datetime
+from config import Config
+from port_locks import all_ports, port_lock, pump_port
+from serialization import PumpORJSONResponse
 from ws_pumps import router as pumps_ws
 
 from models import (
     ChangePricesRequest,
     ChangePricesResponse,
     BulkChangePricesResponse,
+    GradeUpdateResult,
+    PumpPriceUpdateResult,
     PumpInfo,
     PumpStatusResponse,
     PumpDiscoveryResult,
@@ -23,37 +32,78 @@ from models import (
 )
 # from pump_manager import PumpManager
 
+# Results are built from server-side state only, so skip re-validation
+_construct_grade_result = GradeUpdateResult.model_construct
+_construct_pump_result = PumpPriceUpdateResult.model_construct
+
 COMPORT = "COM3"
 
 
-logging.basicConfig(
-    level=logging.ERROR,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler(), logging.FileHandler("logs/logs.log", mode="a")],
+# Endpoints only enqueue records; the listener thread does the actual
+# console/file writes so the event loop never blocks on disk I/O.
+_log_queue: queue.Queue = queue.Queue(-1)
+_log_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(_log_formatter)
+_file_handler = logging.FileHandler("logs/logs.log", mode="a")
+_file_handler.setFormatter(_log_formatter)
+log_listener = QueueListener(
+    _log_queue, _stream_handler, _file_handler, respect_handler_level=True
 )
 
-logging.getLogger("GilbarcoAPI").setLevel(logging.ERROR)
-logging.getLogger("GilbarcoStartup").setLevel(logging.ERROR)
-logging.getLogger("PumpManager").setLevel(logging.ERROR)
-logging.getLogger("TwoWireManager").setLevel(logging.ERROR)
-logging.getLogger("SerialConnection").setLevel(logging.ERROR)
-logging.getLogger("uvicorn").setLevel(logging.ERROR)
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        # Built by a factory: Python 3.12.0-3.12.3 dictConfig rejects a
+        # queue instance passed under "queue"
+        "queue": {"()": lambda: QueueHandler(_log_queue)},
+    },
+    "root": {"level": "ERROR", "handlers": ["queue"]},
+    "loggers": {
+        name: {"level": "ERROR"}
+        for name in (
+            "GilbarcoAPI",
+            "GilbarcoStartup",
+            "PumpManager",
+            "TwoWireManager",
+            "SerialConnection",
+            "uvicorn",
+        )
+    },
+}
+
+logging.config.dictConfig(LOGGING)
 
 logger = logging.getLogger("GilbarcoAPI")
 startup_logger = logging.getLogger("GilbarcoStartup")
 
-# pump_manager: Optional[PumpManager] = None
+
+async def get_pump_manager(request: Request):
+    """Resolve the shared PumpManager from app state for a request"""
+    # async so FastAPI calls it on the event loop instead of a worker thread
+    pm = request.app.state.pump_manager
+    if not pm:
+        raise HTTPException(status_code=500, detail="Pump manager not initialized")
+    return pm
+
+
+async def get_request_time() -> datetime:
+    """Single timestamp shared by everything a request reports"""
+    return datetime.now()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle"""
-    global pump_manager
+    log_listener.start()
 
     startup_logger.info("=== Starting Gilbarco SK700-II Control System ===")
     startup_logger.info(f"Startup time: {datetime.now()}")
 
-    from config import settings
+    from config import get_settings
+
+    settings = get_settings()
 
     startup_logger.info(f"Configuration: {settings.dict()}")
 
@@ -69,11 +119,13 @@ async def lifespan(app: FastAPI):
     yield
 
     startup_logger.info("=== Shutting down Gilbarco SK700-II Control System ===")
+    pump_manager = app.state.pump_manager
     if pump_manager:
         startup_logger.info("Shutting down Pump Manager...")
         pump_manager.shutdown()
         startup_logger.info("Pump Manager shutdown complete")
     startup_logger.info("System shutdown complete")
+    log_listener.stop()
 
 
 app = FastAPI(
@@ -83,6 +135,7 @@ app = FastAPI(
     """,
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=PumpORJSONResponse,
     docs_url="/docs",
     openapi_tags=[
         {"name": "Health", "description": "API health and system status endpoints"},
@@ -110,13 +163,14 @@ app = FastAPI(
     ],
 )
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+if Config.CORS_ORIGINS:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=list(Config.CORS_ORIGINS),
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
 
 app.include_router(pumps_ws)
 
@@ -133,14 +187,17 @@ async def root():
     summary="Health Check",
     description="Check if the API is running and healthy. Returns system status and pump count.",
 )
-async def health_check():
+async def health_check(request: Request):
     """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "service": "Gilbarco SK700-II Control API",
-        "version": "1.0.0",
-        "pumps_managed": len(pump_manager.pumps) if pump_manager else 0,
-    }
+    pump_manager = getattr(request.app.state, "pump_manager", None)
+    return PumpORJSONResponse(
+        {
+            "status": "healthy",
+            "service": "Gilbarco SK700-II Control API",
+            "version": "1.0.0",
+            "pumps_managed": len(pump_manager.pumps) if pump_manager else 0,
+        }
+    )
 
 
 @app.post(
@@ -169,10 +226,8 @@ async def discover_pumps(
     timeout: float = Query(
         0.1, gt=0, le=10, description="Timeout in seconds for each pump test"
     ),
+    pm=Depends(get_pump_manager),
 ):
-    if not pump_manager:
-        raise HTTPException(status_code=500, detail="Pump manager not initialized")
-
     try:
         if address_range_start > address_range_end:
             raise HTTPException(
@@ -180,13 +235,14 @@ async def discover_pumps(
                 detail="address_range_start must be less than or equal to address_range_end",
             )
 
-        result = pump_manager.auto_discover_and_manage(
-            com_ports=[COMPORT],
-            address_range=(address_range_start, address_range_end),
-            timeout=timeout,
-        )
+        with port_lock(COMPORT):
+            result = pm.auto_discover_and_manage(
+                com_ports=[COMPORT],
+                address_range=(address_range_start, address_range_end),
+                timeout=timeout,
+            )
 
-        return result
+        return PumpORJSONResponse(result)
 
     except Exception as e:
         logger.error(f"Error during pump discovery: {str(e)}")
@@ -200,7 +256,7 @@ async def discover_pumps(
     summary="Get All Pumps",
     description="Get information about all managed pumps in the system.",
 )
-async def get_all_pumps():
+async def get_all_pumps(pm=Depends(get_pump_manager)):
     """
     Get a list of all pumps currently managed by the system.
 
@@ -210,10 +266,7 @@ async def get_all_pumps():
     - Address
     - Connection status
     """
-    if not pump_manager:
-        raise HTTPException(status_code=500, detail="Pump manager not initialized")
-
-    return pump_manager.get_pump_list()
+    return PumpORJSONResponse(pm.get_pump_list())
 
 
 @app.get(
@@ -223,17 +276,16 @@ async def get_all_pumps():
     summary="Get Pump Info",
     description="Get detailed information about a specific pump by ID.",
 )
-async def get_pump_info(pump_id: int = Path(..., description="Pump ID", ge=1)):
+async def get_pump_info(
+    pump_id: int = Path(..., description="Pump ID", ge=1),
+    pm=Depends(get_pump_manager),
+):
     """Get information about a specific pump by ID"""
-    if not pump_manager:
-        raise HTTPException(status_code=500, detail="Pump manager not initialized")
-
-    pumps = pump_manager.get_pump_list()
-    for pump in pumps:
-        if pump.pump_id == pump_id:
-            return pump
+    pump = pm.get_pump_info(pump_id)
+    if not pump:
+        raise HTTPException(status_code=404, detail=f"Pump {pump_id} not found")
 
-    raise HTTPException(status_code=404, detail=f"Pump {pump_id} not found")
+    return PumpORJSONResponse(pump)
 
 
 @app.get(
@@ -251,7 +303,10 @@ async def get_pump_info(pump_id: int = Path(..., description="Pump ID", ge=1)):
          - Current transaction data (if any)
          """,
 )
-async def get_pump_status(pump_id: int = Path(..., description="Pump ID", ge=1)):
+async def get_pump_status(
+    pump_id: int = Path(..., description="Pump ID", ge=1),
+    pm=Depends(get_pump_manager),
+):
     """
     Get the current status of a specific pump.
 
@@ -260,14 +315,12 @@ async def get_pump_status(pump_id: int = Path(..., description="Pump ID", ge=1))
     - Last update timestamp
     - Error message if applicable
     """
-    if not pump_manager:
-        raise HTTPException(status_code=500, detail="Pump manager not initialized")
-
-    status = pump_manager.get_pump_status(pump_id)
+    with pump_port(pm, pump_id):
+        status = pm.get_pump_status(pump_id)
     if not status:
         raise HTTPException(status_code=404, detail=f"Pump {pump_id} not found")
 
-    return status
+    return PumpORJSONResponse(status)
 
 
 @app.get(
@@ -279,14 +332,15 @@ async def get_pump_status(pump_id: int = Path(..., description="Pump ID", ge=1))
          Get transaction data from a specific pump.
         """,
 )
-async def get_realtime_money(pump_id: int = Path(..., description="Pumpd ID", ge=1)):
+async def get_realtime_money(
+    pump_id: int = Path(..., description="Pumpd ID", ge=1),
+    pm=Depends(get_pump_manager),
+):
     """
     Get realtime money for a specific pump. Pump must be in `BUSY` state
     """
-    if not pump_manager:
-        raise HTTPException(status_code=500, detail="Pump manager not initialized")
-
-    realtime = pump_manager.get_realtime(pump_id)
+    with pump_port(pm, pump_id):
+        realtime = pm.get_realtime(pump_id)
 
     if not realtime:
         raise HTTPException(
@@ -295,7 +349,9 @@ async def get_realtime_money(pump_id: int = Path(..., description="Pumpd ID", ge
             f"Pump may not exist or it is not in wrong state",
         )
 
-    return RealtimeData(pump_id=pump_id, money=realtime)
+    return PumpORJSONResponse(
+        RealtimeData.model_construct(pump_id=pump_id, money=realtime)
+    )
 
 
 @app.get(
@@ -307,14 +363,15 @@ async def get_realtime_money(pump_id: int = Path(..., description="Pumpd ID", ge
          Get transaction data from a specific pump.
         """,
 )
-async def get_pump_transaction(pump_id: int = Path(..., description="Pump ID", ge=1)):
+async def get_pump_transaction(
+    pump_id: int = Path(..., description="Pump ID", ge=1),
+    pm=Depends(get_pump_manager),
+):
     """
     Get transaction data from a specific pump.
     """
-    if not pump_manager:
-        raise HTTPException(status_code=500, detail="Pump manager not initialized")
-
-    transaction_data = pump_manager.get_transaction_data(pump_id)
+    with pump_port(pm, pump_id):
+        transaction_data = pm.get_transaction_data(pump_id)
     if not transaction_data:
         raise HTTPException(
             status_code=404,
@@ -322,7 +379,7 @@ async def get_pump_transaction(pump_id: int = Path(..., description="Pump ID", g
             f"Pump may not exist or no transaction in progress/completed.",
         )
 
-    return transaction_data
+    return PumpORJSONResponse(transaction_data)
 
 
 @app.post(
@@ -332,24 +389,27 @@ async def get_pump_transaction(pump_id: int = Path(..., description="Pump ID", g
     summary="Authorize Pump",
     description="Authorize a pump for dispensing. According to Two-Wire Protocol, the authorize command does not return a response, so we poll the pump status afterward to verify authorization.",
 )
-async def authorize_pump(pump_id: int = Path(..., description="Pump ID", ge=1)):
+async def authorize_pump(
+    pump_id: int = Path(..., description="Pump ID", ge=1),
+    now: datetime = Depends(get_request_time),
+):
     """
     Authorize a specific pump for dispensing.
 
     This endpoint sends an authorize command to the pump and then polls the pump
     status to verify that the authorization was successful.
     """
-    return CommandResponse(
-        success=True,
-        message=f"Pump {pump_id} authorized successfully",
-        data={
-            "pump_id": pump_id,
-            "status": (
-                "AUTHORIZED" 
-            ),
-            "authorized_at": datetime.now().isoformat(),
-        },
-        timestamp=datetime.now(),
+    return PumpORJSONResponse(
+        CommandResponse.model_construct(
+            success=True,
+            message=f"Pump {pump_id} authorized successfully",
+            data={
+                "pump_id": pump_id,
+                "status": "AUTHORIZED",
+                "authorized_at": now.isoformat(),
+            },
+            timestamp=now,
+        )
     )
 
 
@@ -360,7 +420,11 @@ async def authorize_pump(pump_id: int = Path(..., description="Pump ID", ge=1)):
     summary="Stop Pump",
     description="Stop a pump that is currently dispensing or authorized. According to Two-Wire Protocol, the stop command does not return a response, so we poll the pump status afterward to verify the stop.",
 )
-async def stop_pump(pump_id: int = Path(..., description="Pump ID", ge=1)):
+async def stop_pump(
+    pump_id: int = Path(..., description="Pump ID", ge=1),
+    pm=Depends(get_pump_manager),
+    now: datetime = Depends(get_request_time),
+):
     """
     Stop a specific pump.
 
@@ -372,38 +436,39 @@ async def stop_pump(pump_id: int = Path(..., description="Pump ID", ge=1)):
     - message: Description of the result
     - data: Pump status information after stop
     """
-    if not pump_manager:
-        raise HTTPException(status_code=500, detail="Pump manager not initialized")
-
-    if pump_id not in pump_manager.pumps:
+    if pump_id not in pm.pumps:
         raise HTTPException(status_code=404, detail=f"Pump {pump_id} not found")
 
     try:
-        # Stop the pump
-        success = pump_manager.stop_pump(pump_id)
+        with pump_port(pm, pump_id):
+            # Stop the pump
+            success = pm.stop_pump(pump_id)
+            # Get the current status after stopping
+            status_response = pm.get_pump_status(pump_id) if success else None
 
         if success:
-            # Get the current status after stopping
-            status_response = pump_manager.get_pump_status(pump_id)
-
-            return CommandResponse(
-                success=True,
-                message=f"Pump {pump_id} stopped successfully",
-                data={
-                    "pump_id": pump_id,
-                    "status": (
-                        status_response.status.value if status_response else "UNKNOWN"
-                    ),
-                    "stopped_at": datetime.now().isoformat(),
-                },
-                timestamp=datetime.now(),
+            return PumpORJSONResponse(
+                CommandResponse.model_construct(
+                    success=True,
+                    message=f"Pump {pump_id} stopped successfully",
+                    data={
+                        "pump_id": pump_id,
+                        "status": (
+                            status_response.status.value if status_response else "UNKNOWN"
+                        ),
+                        "stopped_at": now.isoformat(),
+                    },
+                    timestamp=now,
+                )
             )
         else:
-            return CommandResponse(
-                success=False,
-                message=f"Failed to stop pump {pump_id}",
-                data={"pump_id": pump_id},
-                timestamp=datetime.now(),
+            return PumpORJSONResponse(
+                CommandResponse.model_construct(
+                    success=False,
+                    message=f"Failed to stop pump {pump_id}",
+                    data={"pump_id": pump_id},
+                    timestamp=now,
+                )
             )
 
     except Exception as e:
@@ -421,7 +486,9 @@ async def stop_pump(pump_id: int = Path(..., description="Pump ID", ge=1)):
     summary="Emergency Stop All Pumps",
     description="Send emergency stop command to all pumps on all connected COM ports. This is used in emergency situations to immediately stop all fuel dispensing operations.",
 )
-async def stop_all_pumps():
+async def stop_all_pumps(
+    pm=Depends(get_pump_manager), now: datetime = Depends(get_request_time)
+):
     """
     Emergency stop all pumps on all connected COM ports.
 
@@ -435,37 +502,39 @@ async def stop_all_pumps():
     - message: Description of the result
     - data: Information about the emergency stop operation
     """
-    if not pump_manager:
-        raise HTTPException(status_code=500, detail="Pump manager not initialized")
-
     try:
-        success = pump_manager.stop_all_pumps()
+        with all_ports(pm):
+            success = pm.stop_all_pumps()
 
-        active_ports = list(pump_manager.managers.keys())
-        total_pumps = len(pump_manager.pumps)
+        active_ports = tuple(pm.managers)
+        total_pumps = len(pm.pumps)
 
         if success:
-            return CommandResponse(
-                success=True,
-                message=f"Emergency stop sent successfully to all {len(active_ports)} COM ports",
-                data={
-                    "emergency_stop_at": datetime.now().isoformat(),
-                    "com_ports": active_ports,
-                    "total_pumps_affected": total_pumps,
-                    "operation": "EMERGENCY_STOP_ALL",
-                },
-                timestamp=datetime.now(),
+            return PumpORJSONResponse(
+                CommandResponse.model_construct(
+                    success=True,
+                    message=f"Emergency stop sent successfully to all {len(active_ports)} COM ports",
+                    data={
+                        "emergency_stop_at": now.isoformat(),
+                        "com_ports": active_ports,
+                        "total_pumps_affected": total_pumps,
+                        "operation": "EMERGENCY_STOP_ALL",
+                    },
+                    timestamp=now,
+                )
             )
         else:
-            return CommandResponse(
-                success=False,
-                message="Failed to send emergency stop to all COM ports",
-                data={
-                    "com_ports": active_ports,
-                    "total_pumps": total_pumps,
-                    "operation": "EMERGENCY_STOP_ALL",
-                },
-                timestamp=datetime.now(),
+            return PumpORJSONResponse(
+                CommandResponse.model_construct(
+                    success=False,
+                    message="Failed to send emergency stop to all COM ports",
+                    data={
+                        "com_ports": active_ports,
+                        "total_pumps": total_pumps,
+                        "operation": "EMERGENCY_STOP_ALL",
+                    },
+                    timestamp=now,
+                )
             )
 
     except Exception as e:
@@ -488,6 +557,7 @@ async def stop_all_pumps():
 async def set_volume_preset(
     request: VolumePresetRequest,
     pump_id: int = Path(..., description="Pump ID", ge=1),
+    now: datetime = Depends(get_request_time),
 ):
     """
     Set volume preset for a specific pump.
@@ -497,19 +567,21 @@ async def set_volume_preset(
         HTTPException: If pump not found or preset fails
     """
 
-    logger.info(f"Volume preset set successfully for pump {pump_id}")
-    return PresetResponse(
-        success=True,
-        message=f"Volume preset set: {request.volume} gallons for grade {request.grade}",
-        pump_id=pump_id,
-        preset_data={
-            "type": "volume",
-            "volume": request.volume,
-            "grade": request.grade,
-            "pump_address": "pump address",
-        },
-        timestamp=datetime.now(),
+    logger.info("Volume preset set successfully for pump %s", pump_id)
+    return PumpORJSONResponse(
+        PresetResponse.model_construct(
+            success=True,
+            message=f"Volume preset set: {request.volume} gallons for grade {request.grade}",
+            pump_id=pump_id,
+            preset_data={
+                "type": "volume",
+                "volume": request.volume,
+                "grade": request.grade,
+                "pump_address": "pump address",
+            },
+            timestamp=now,
         )
+    )
 
 
 @app.post(
@@ -525,26 +597,50 @@ async def set_volume_preset(
 async def set_money_preset(
     request: MoneyPresetRequest,
     pump_id: int = Path(..., description="Pump ID", ge=1, le=16),
+    now: datetime = Depends(get_request_time),
 ):
     """
     Set money preset for a specific pump.
     """
     
-    logger.info(f"Money preset set successfully for pump {pump_id}")
-    return PresetResponse(
-        success=True,
-        message=f"Money preset set: ${request.money_amount:.2f} for grade {request.grade}",
-        pump_id=pump_id,
-        preset_data={
-            "type": "money",
-            "money_amount": request.money_amount,
-            "grade": request.grade,
-            "price_level": 1,
-            "pump_address": "pump address",
-        },
-        timestamp=datetime.now(),
+    logger.info("Money preset set successfully for pump %s", pump_id)
+    return PumpORJSONResponse(
+        PresetResponse.model_construct(
+            success=True,
+            message=f"Money preset set: ${request.money_amount:.2f} for grade {request.grade}",
+            pump_id=pump_id,
+            preset_data={
+                "type": "money",
+                "money_amount": request.money_amount,
+                "grade": request.grade,
+                "price_level": 1,
+                "pump_address": "pump address",
+            },
+            timestamp=now,
+        )
     )
-        
+
+
+def _pad_grade_results(grades_info, result) -> list:
+    """Align per-grade results with the request, missing results count as failed"""
+    n_grades = len(grades_info)
+    return list(result[:n_grades]) + [False] * (n_grades - len(result))
+
+
+def _build_grade_results(grades_info, results) -> List[GradeUpdateResult]:
+    """Build GradeUpdateResult entries for already padded per-grade results"""
+    return [
+        _construct_grade_result(
+            grade_id=grade_info.id,
+            grade_title=grade_info.title,
+            new_price=grade_info.price,
+            success=success,
+            message=f"Price updated to {grade_info.price}" if success else f"Failed to update price for grade {grade_info.id}",
+        )
+        for grade_info, success in zip(grades_info, results)
+    ]
+
+
 @app.post(
     "/api/pumps/{pump_id}/change-prices",
     response_model=ChangePricesResponse,
@@ -557,56 +653,61 @@ async def set_money_preset(
 async def change_prices(
     request: ChangePricesRequest,
     pump_id: int = Path(..., description="Pump ID", ge=1, le=16),
+    pm=Depends(get_pump_manager),
+    now: datetime = Depends(get_request_time),
 ):
-    if not pump_manager:
-        raise HTTPException(status_code=500, detail="Pump manager not initialized")
     
-    logger.info(
-        f"Changing price for {pump_id}, grades: ${request.grades_info}"
-    )
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Changing price for %s, grades: %s", pump_id, request.grades_info)
 
-    pump_info = pump_manager.get_pump_info(pump_id)
+    pump_info = pm.get_pump_info(pump_id)
     if not pump_info:
         raise HTTPException(status_code=404, detail=f"Pump {pump_id} not found")
 
-    result = pump_manager.change_prices(
-        pump_id,
-        request.grades_info,
-    )
+    with pump_port(pm, pump_id):
+        result = pm.change_prices(
+            pump_id,
+            request.grades_info,
+        )
 
-    grade_results = []
-    overall_success = True
-    
-    for i, grade_info in enumerate(request.grades_info):
-        grade_success = result[i] if i < len(result) else False
-        if not grade_success:
-            overall_success = False
-            
-        grade_results.append({
-            "grade_id": grade_info.id,
-            "grade_title": grade_info.title,
-            "new_price": grade_info.price,
-            "success": grade_success,
-            "message": f"Price updated to {grade_info.price}" if grade_success else f"Failed to update price for grade {grade_info.id}"
-        })
-
-    successful_count = sum(result)
+    results = _pad_grade_results(request.grades_info, result)
+    grade_results = _build_grade_results(request.grades_info, results)
+    overall_success = all(results)
+
+    successful_count = sum(results)
     failed_count = len(request.grades_info) - successful_count
 
-    logger.info(f"Prices changed for pump {pump_id}: {successful_count}/{len(request.grades_info)} successful")
+    logger.info(
+        "Prices changed for pump %s: %s/%s successful",
+        pump_id,
+        successful_count,
+        len(request.grades_info),
+    )
     
-    return ChangePricesResponse(
-        success=overall_success,
-        message=f"{successful_count} of {len(request.grades_info)} grades updated successfully.",
-        pump_id=pump_id,
-        total_grades=len(request.grades_info),
-        successful_updates=successful_count,
-        failed_updates=failed_count,
-        grade_results=grade_results,
-        timestamp=datetime.now(),
+    return PumpORJSONResponse(
+        ChangePricesResponse.model_construct(
+            success=overall_success,
+            message=f"{successful_count} of {len(request.grades_info)} grades updated successfully.",
+            pump_id=pump_id,
+            total_grades=len(request.grades_info),
+            successful_updates=successful_count,
+            failed_updates=failed_count,
+            grade_results=grade_results,
+            timestamp=now,
+        )
     )
 
 
+def _change_prices_on_port(
+    pm, com_port: str, pump_ids: List[int], grades_info
+) -> Dict[int, list]:
+    """Change prices, one pump after another, for pumps sharing one COM port"""
+    with port_lock(com_port):
+        return {
+            pump_id: pm.change_prices(pump_id, grades_info) for pump_id in pump_ids
+        }
+
+
 @app.post(
     "/api/pumps/change-prices",
     response_model=BulkChangePricesResponse,
@@ -617,69 +718,84 @@ async def change_prices(
     Returns detailed results for each pump and grade.
     """
 )
-async def change_prices_for_all(request: ChangePricesRequest):
-    if not pump_manager:
-        raise HTTPException(status_code=500, detail="Pump manager not initialized")
+async def change_prices_for_all(
+    request: ChangePricesRequest,
+    pm=Depends(get_pump_manager),
+    now: datetime = Depends(get_request_time),
+):
     
-    logger.info(
-        f"Changing prices for all pumps, grades: {request.grades_info}"
-    )
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Changing prices for all pumps, grades: %s", request.grades_info)
     
+    grades = tuple(request.grades_info)
+    n_grades = len(grades)
+    pumps = list(pm.pumps.values())
+    n_pumps = len(pumps)
+    pump_ids_by_port: Dict[str, List[int]] = {}
+    for pump in pumps:
+        pump_ids_by_port.setdefault(pump.com_port, []).append(pump.pump_id)
+
+    # Two-Wire is half-duplex, so pumps on one port are updated in order
+    # under that port's lock, while separate COM ports run concurrently
+    port_results = await asyncio.gather(
+        *(
+            asyncio.to_thread(_change_prices_on_port, pm, com_port, pump_ids, grades)
+            for com_port, pump_ids in pump_ids_by_port.items()
+        )
+    )
+    results_by_pump = {}
+    for port_result in port_results:
+        results_by_pump.update(port_result)
+
     pump_results = []
     overall_success = True
     successful_pumps = 0
     
-    for pump in pump_manager.pumps.values():
-        result = pump_manager.change_prices(
-            pump.pump_id,
-            request.grades_info,
-        )
-        
-        grade_results = []
-        pump_success = True
-        
-        for i, grade_info in enumerate(request.grades_info):
-            grade_success = result[i] if i < len(result) else False
-            if not grade_success:
-                pump_success = False
-                overall_success = False
-                
-            grade_results.append({
-                "grade_id": grade_info.id,
-                "grade_title": grade_info.title,
-                "new_price": grade_info.price,
-                "success": grade_success,
-                "message": f"Price updated to {grade_info.price}" if grade_success else f"Failed to update price for grade {grade_info.id}"
-            })
+    for pump in pumps:
+        result = results_by_pump[pump.pump_id]
         
-        successful_count = sum(result)
-        failed_count = len(request.grades_info) - successful_count
+        results = _pad_grade_results(grades, result)
+        grade_results = _build_grade_results(grades, results)
+        pump_success = all(results)
+        if not pump_success:
+            overall_success = False
+
+        successful_count = sum(results)
+        failed_count = n_grades - successful_count
         
         if pump_success:
             successful_pumps += 1
             
-        pump_results.append({
-            "pump_id": pump.pump_id,
-            "success": pump_success,
-            "message": f"All {len(request.grades_info)} grades updated successfully" if pump_success else f"{successful_count} of {len(request.grades_info)} grades updated successfully",
-            "total_grades": len(request.grades_info),
-            "successful_updates": successful_count,
-            "failed_updates": failed_count,
-            "grade_results": grade_results
-        })
+        pump_results.append(
+            _construct_pump_result(
+                pump_id=pump.pump_id,
+                success=pump_success,
+                message=f"All {n_grades} grades updated successfully" if pump_success else f"{successful_count} of {n_grades} grades updated successfully",
+                total_grades=n_grades,
+                successful_updates=successful_count,
+                failed_updates=failed_count,
+                grade_results=grade_results,
+            )
+        )
     
-    failed_pumps = len(pump_manager.pumps) - successful_pumps
+    failed_pumps = n_pumps - successful_pumps
     
-    logger.info(f"Bulk price change completed: {successful_pumps}/{len(pump_manager.pumps)} pumps fully successful")
+    logger.info(
+        "Bulk price change completed: %s/%s pumps fully successful",
+        successful_pumps,
+        n_pumps,
+    )
     
-    return BulkChangePricesResponse(
-        success=overall_success,
-        message=f"Price update completed for {len(pump_manager.pumps)} pumps. {successful_pumps} pumps fully successful, {failed_pumps} pumps had some failures.",
-        total_pumps=len(pump_manager.pumps),
-        successful_pumps=successful_pumps,
-        failed_pumps=failed_pumps,
-        pump_results=pump_results,
-        timestamp=datetime.now(),
+    return PumpORJSONResponse(
+        BulkChangePricesResponse.model_construct(
+            success=overall_success,
+            message=f"Price update completed for {n_pumps} pumps. {successful_pumps} pumps fully successful, {failed_pumps} pumps had some failures.",
+            total_pumps=n_pumps,
+            successful_pumps=successful_pumps,
+            failed_pumps=failed_pumps,
+            pump_results=pump_results,
+            timestamp=now,
+        )
     )
 
 
@@ -690,19 +806,20 @@ async def change_prices_for_all(request: ChangePricesRequest):
     description="Establish serial connection to a specific COM port (all pumps on that port).",
 )
 async def connect_port(
-    com_port: str = Path(..., description="COM port (e.g., COM1, /dev/ttyUSB0)")
+    com_port: str = Path(..., description="COM port (e.g., COM1, /dev/ttyUSB0)"),
+    pm=Depends(get_pump_manager),
 ):
     """Connect to a specific COM port"""
-    if not pump_manager:
-        raise HTTPException(status_code=500, detail="Pump manager not initialized")
-
-    success = pump_manager.connect_port(com_port)
+    with port_lock(com_port):
+        success = pm.connect_port(com_port)
     if not success:
         raise HTTPException(
             status_code=400, detail=f"Failed to connect to COM port {com_port}"
         )
 
-    return {"message": f"Successfully connected to COM port {com_port}"}
+    return PumpORJSONResponse(
+        {"message": f"Successfully connected to COM port {com_port}"}
+    )
 
 
 @app.post(
@@ -712,19 +829,20 @@ async def connect_port(
     description="Disconnect from a specific COM port (all pumps on that port).",
 )
 async def disconnect_port(
-    com_port: str = Path(..., description="COM port (e.g., COM1, /dev/ttyUSB0)")
+    com_port: str = Path(..., description="COM port (e.g., COM1, /dev/ttyUSB0)"),
+    pm=Depends(get_pump_manager),
 ):
     """Disconnect from a specific COM port"""
-    if not pump_manager:
-        raise HTTPException(status_code=500, detail="Pump manager not initialized")
-
-    success = pump_manager.disconnect_port(com_port)
+    with port_lock(com_port):
+        success = pm.disconnect_port(com_port)
     if not success:
         raise HTTPException(
             status_code=404, detail=f"COM port {com_port} not found or not connected"
         )
 
-    return {"message": f"Successfully disconnected from COM port {com_port}"}
+    return PumpORJSONResponse(
+        {"message": f"Successfully disconnected from COM port {com_port}"}
+    )
 
 
 @app.post(
@@ -733,19 +851,19 @@ async def disconnect_port(
     summary="Connect to All COM Ports",
     description="Connect to all COM ports used by managed pumps.",
 )
-async def connect_all_ports():
+async def connect_all_ports(pm=Depends(get_pump_manager)):
     """Connect to all COM ports used by managed pumps"""
-    if not pump_manager:
-        raise HTTPException(status_code=500, detail="Pump manager not initialized")
-
-    results = pump_manager.connect_all_ports()
+    with all_ports(pm):
+        results = pm.connect_all_ports()
 
-    return {
-        "message": "Connection attempt completed for all COM ports",
-        "results": results,
-        "successful_connections": sum(1 for success in results.values() if success),
-        "total_ports": len(results),
-    }
+    return PumpORJSONResponse(
+        {
+            "message": "Connection attempt completed for all COM ports",
+            "results": results,
+            "successful_connections": sum(results.values()),
+            "total_ports": len(results),
+        }
+    )
 
 
 @app.post(
@@ -754,14 +872,14 @@ async def connect_all_ports():
     summary="Disconnect from All COM Ports",
     description="Disconnect from all COM ports used by managed pumps.",
 )
-async def disconnect_all_ports():
+async def disconnect_all_ports(pm=Depends(get_pump_manager)):
     """Disconnect from all COM ports"""
-    if not pump_manager:
-        raise HTTPException(status_code=500, detail="Pump manager not initialized")
+    with all_ports(pm):
+        pm.disconnect_all_ports()
 
-    pump_manager.disconnect_all_ports()
-
-    return {"message": "Successfully disconnected from all COM ports"}
+    return PumpORJSONResponse(
+        {"message": "Successfully disconnected from all COM ports"}
+    )
 
 
 @app.get(
@@ -770,11 +888,10 @@ async def disconnect_all_ports():
     summary="Get Connected COM Ports",
     description="Get a list of currently connected COM ports.",
 )
-async def get_connected_ports():
+async def get_connected_ports(pm=Depends(get_pump_manager)):
     """Get list of currently connected COM ports"""
-    if not pump_manager:
-        raise HTTPException(status_code=500, detail="Pump manager not initialized")
-
-    connected_ports = pump_manager.get_connected_ports()
+    connected_ports = pm.get_connected_ports()
 
-    return {"connected_ports": connected_ports, "total_connected": len(connected_ports)}
+    return PumpORJSONResponse(
+        {"connected_ports": connected_ports, "total_connected": len(connected_ports)}
+    )
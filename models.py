@@ -1,6 +1,6 @@
 from typing import Dict, List, Optional, Any
 from enum import Enum
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 
 
@@ -74,6 +74,8 @@ class PumpStatusResponse(BaseModel):
 
 
 class RealtimeData(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     pump_id: int = Field(..., description="Pump identifier")
     money: float = Field(None, description="Dispensed realtime money")
 
@@ -100,6 +102,8 @@ class CommandRequest(BaseModel):
 class CommandResponse(BaseModel):
     """Generic command response"""
 
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     success: bool = Field(..., description="Command execution success")
     message: str = Field(..., description="Response message")
     data: Optional[Dict[str, Any]] = Field(None, description="Response data")
@@ -129,11 +133,11 @@ class PumpDiscoveryResult(BaseModel):
 class GradeTotals(BaseModel):
     """Totals data for a single grade"""
 
-    grade: int = Field(..., description="Grade number")
-    volume: float = Field(..., description="Total volume dispensed (gallons)")
-    money: float = Field(..., description="Total money amount ($)")
-    volume_raw: Optional[str] = Field(None, description="Raw volume data (hex)")
-    money_raw: Optional[str] = Field(None, description="Raw money data (hex)")
+    grade: int
+    volume: float  # gallons
+    money: float  # $
+    volume_raw: Optional[str] = None  # hex
+    money_raw: Optional[str] = None  # hex
 
 
 class PumpTotalsResponse(BaseModel):
@@ -141,7 +145,9 @@ class PumpTotalsResponse(BaseModel):
 
     pump_id: int = Field(..., description="Pump ID")
     total_grades: int = Field(..., description="Number of grades with data")
-    grades: Dict[int, GradeTotals] = Field(..., description="Totals data by grade")
+    grades: List[GradeTotals] = Field(
+        ..., description="Totals per grade, one entry per grade with data"
+    )
     lrc_checksum: Optional[str] = Field(None, description="LRC checksum (hex)")
     timestamp: datetime = Field(..., description="Response timestamp")
 
@@ -174,12 +180,14 @@ class MoneyPresetRequest(BaseModel):
     
 class ChangePricesRequest(BaseModel):
     """Request model for changing prices for a specific pump"""
-    
+
     grades_info: List[GradeInfo] = Field(..., description="Grade info (id, price, title - optional)")
 
 class PresetResponse(BaseModel):
     """Response model for preset operations"""
 
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     success: bool = Field(..., description="Operation success")
     message: str = Field(..., description="Response message")
     pump_id: int = Field(..., description="Pump identifier")
@@ -188,8 +196,11 @@ class PresetResponse(BaseModel):
 
 class GradeUpdateResult(BaseModel):
     """Result for a single grade update"""
+
+    model_config = ConfigDict(frozen=True)
+
     grade_id: int = Field(..., description="Grade identifier")
-    grade_title: str = Field(..., description="Grade title (e.g., AI-80)")
+    grade_title: Optional[str] = Field(None, description="Grade title (e.g., AI-80)")
     new_price: float = Field(..., description="New price that was set")
     success: bool = Field(..., description="Whether the update was successful")
     message: str = Field(..., description="Success or error message")
@@ -197,6 +208,9 @@ class GradeUpdateResult(BaseModel):
 
 class ChangePricesResponse(BaseModel):
     """Response model for changing prices for a specific pump"""
+
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     success: bool = Field(..., description="Overall operation success (true if ALL grades updated successfully)")
     message: str = Field(..., description="Overall operation message")
     pump_id: int = Field(..., description="Pump identifier")
@@ -209,6 +223,9 @@ class ChangePricesResponse(BaseModel):
 
 class PumpPriceUpdateResult(BaseModel):
     """Result for price update on a single pump"""
+
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     pump_id: int = Field(..., description="Pump identifier")
     success: bool = Field(..., description="Overall success for this pump")
     message: str = Field(..., description="Overall message for this pump")
@@ -220,10 +237,13 @@ class PumpPriceUpdateResult(BaseModel):
 
 class BulkChangePricesResponse(BaseModel):
     """Response model for changing prices across all pumps"""
+
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     success: bool = Field(..., description="Overall operation success (true if ALL pumps updated successfully)")
     message: str = Field(..., description="Overall operation summary")
     total_pumps: int = Field(..., description="Total number of pumps attempted")
     successful_pumps: int = Field(..., description="Number of pumps that had all grades updated successfully")
     failed_pumps: int = Field(..., description="Number of pumps that had some or all grade updates fail")
     pump_results: List[PumpPriceUpdateResult] = Field(..., description="Detailed results for each pump")
-    timestamp: datetime = Field(..., description="Response timestamp")
\ No newline at end of file
+    timestamp: datetime = Field(..., description="Response timestamp")
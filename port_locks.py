@@ -0,0 +1,42 @@
+# port_locks.py - One lock per COM port for PumpManager bus traffic
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterator
+
+# Two-Wire is half-duplex: status polls, price downloads and commands for
+# pumps on one port must not interleave. PumpManager is called from the
+# event loop, the websocket producer thread and the price-update threads,
+# so every call that talks on a port holds that port's lock.
+_port_locks: Dict[str, threading.RLock] = {}
+_port_locks_guard = threading.Lock()
+
+
+def port_lock(com_port: str) -> threading.RLock:
+    """Return the lock serializing traffic on com_port"""
+    lock = _port_locks.get(com_port)
+    if lock is None:
+        with _port_locks_guard:
+            lock = _port_locks.setdefault(com_port, threading.RLock())
+    return lock
+
+
+@contextmanager
+def pump_port(pm, pump_id: int) -> Iterator[None]:
+    """Hold the lock of the port pump_id is on; unknown pumps take no lock"""
+    pump = pm.pumps.get(pump_id)
+    if pump is None:
+        yield
+        return
+    with port_lock(pump.com_port):
+        yield
+
+
+@contextmanager
+def all_ports(pm) -> Iterator[None]:
+    """Hold the locks of every port the manager knows, in sorted order"""
+    com_ports = set(pm.managers)
+    com_ports.update(pump.com_port for pump in tuple(pm.pumps.values()))
+    with ExitStack() as stack:
+        for com_port in sorted(com_ports):
+            stack.enter_context(port_lock(com_port))
+        yield
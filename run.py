@@ -3,8 +3,11 @@ Startup script for the Gilbarco SK700-II Control System
 """
 
 import sys
+import atexit
 import logging
 import argparse
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
 project_root = Path(__file__).parent
@@ -15,14 +18,22 @@ from config import Config
 
 def setup_logging():
     """Setup logging configuration"""
-    logging.basicConfig(
-        level=getattr(logging, Config.LOG_LEVEL),
-        format=Config.LOG_FORMAT,
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            logging.FileHandler("logs/logs.log"),
-        ],
-    )
+    logging.logThreads = False
+    logging.logProcesses = False
+
+    # Callers only enqueue records; console/file I/O runs on the listener thread
+    log_queue = queue.Queue(-1)
+    formatter = logging.Formatter(Config.LOG_FORMAT)
+    handlers = [logging.StreamHandler(sys.stdout), logging.FileHandler("logs/logs.log")]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, Config.LOG_LEVEL))
+    root.addHandler(QueueHandler(log_queue))
 
 
 def main():
@@ -34,7 +45,7 @@ def main():
     )
     parser.add_argument(
         "--reload",
-        action="store_true",
+        action=argparse.BooleanOptionalAction,
         default=Config.API_RELOAD,
         help="Enable auto-reload for development",
     )
@@ -48,34 +59,40 @@ def main():
     args = parser.parse_args()
 
     # Update config with command line arguments
-    Config.API_HOST = args.host
-    Config.API_PORT = args.port
-    Config.API_RELOAD = args.reload
-    Config.LOG_LEVEL = args.log_level
+    Config.update(
+        API_HOST=args.host,
+        API_PORT=args.port,
+        API_RELOAD=args.reload,
+        LOG_LEVEL=args.log_level,
+    )
 
     setup_logging()
 
     logger = logging.getLogger("GilbarcoStartup")
     logger.info("Starting Gilbarco SK700-II Control System")
-    logger.info(f"Configuration: {Config.get_all_settings()}")
+    logger.info("Configuration: %s", dict(Config.get_all_settings()))
 
     try:
         import uvicorn
 
         uvicorn.run(
             "main:app",
-            host="localhost",
+            host=args.host,
             port=args.port,
-            reload=True,  # Always use reload
+            reload=args.reload,
+            workers=1 if args.reload else Config.API_WORKERS,
             log_level=args.log_level.lower(),
+            loop=Config.API_LOOP,
+            http=Config.API_HTTP,
+            ws_per_message_deflate=Config.WS_PER_MESSAGE_DEFLATE,
         )
 
     except ImportError as e:
-        logger.error(f"Failed to import required modules: {e}")
+        logger.error("Failed to import required modules: %s", e)
         logger.error("Please install dependencies: pip install -r requirements.txt")
         sys.exit(1)
     except Exception as e:
-        logger.error(f"Failed to start server: {e}")
+        logger.error("Failed to start server: %s", e)
         sys.exit(1)
 
 
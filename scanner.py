@@ -2,26 +2,43 @@
 
 import serial
 import time
+import atexit
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from enum import Enum
 from typing import Tuple
 
 COM_PORT = "COM3"
 BAUDRATE = 9600
 TIMEOUT = 1.0
+WRITE_TIMEOUT = 0.1
+INTER_BYTE_TIMEOUT = 0.05
 ADDRESS_RANGE = (1, 16)
+# Send every status poll in a single write and read all replies at once.
+# Only enable on lines where the pumps tolerate back-to-back polls.
+PIPELINED_POLL = False
 
 CMD_STATUS = 0x0  # Status request command code
-STATUS_CODES = {
-    0x0: "DATA_ERROR",
-    0x6: "OFF",
-    0x7: "CALL",
-    0x8: "AUTHORIZED",
-    0x9: "BUSY",
-    0xA: "PEOT",
-    0xB: "FEOT",
-    0xC: "STOP",
-}
+# Status names indexed by the 4-bit status code
+STATUS_CODES = (
+    "DATA_ERROR",  # 0x0
+    "UNKNOWN",
+    "UNKNOWN",
+    "UNKNOWN",
+    "UNKNOWN",
+    "UNKNOWN",
+    "OFF",  # 0x6
+    "CALL",  # 0x7
+    "AUTHORIZED",  # 0x8
+    "BUSY",  # 0x9
+    "PEOT",  # 0xA
+    "FEOT",  # 0xB
+    "STOP",  # 0xC
+    "UNKNOWN",
+    "UNKNOWN",
+    "UNKNOWN",
+)
 
 
 class PumpStatus(Enum):
@@ -38,77 +55,127 @@ class PumpStatus(Enum):
     OFFLINE = "OFFLINE"
 
 
+# PumpStatus indexed by the 4-bit status code
+_STATUS_LUT = (
+    PumpStatus.DATA_ERROR,  # 0x0
+    PumpStatus.OFFLINE,
+    PumpStatus.OFFLINE,
+    PumpStatus.OFFLINE,
+    PumpStatus.OFFLINE,
+    PumpStatus.OFFLINE,
+    PumpStatus.OFF,  # 0x6
+    PumpStatus.CALL,  # 0x7
+    PumpStatus.AUTHORIZED,  # 0x8
+    PumpStatus.BUSY,  # 0x9
+    PumpStatus.PEOT,  # 0xA
+    PumpStatus.FEOT,  # 0xB
+    PumpStatus.STOP,  # 0xC
+    PumpStatus.OFFLINE,
+    PumpStatus.OFFLINE,
+    PumpStatus.OFFLINE,
+)
+
+
 def setup_logging():
     """Setup detailed logging"""
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler("logs/pump_scanner.log", mode="w"),
-        ],
-    )
+    logging.logThreads = False
+    logging.logProcesses = False
+
+    # The scan loop only enqueues records so log I/O cannot eat into the
+    # serial timeout; the listener thread writes them out
+    log_queue = queue.Queue(-1)
+    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    handlers = [
+        logging.StreamHandler(),
+        logging.FileHandler("logs/pump_scanner.log", mode="w"),
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG)
+    root.addHandler(QueueHandler(log_queue))
     return logging.getLogger("PumpScanner")
 
 
 def pump_id_to_nibble(pump_id: int) -> int:
     """Convert pump ID (1-16) to nibble (1-15, 0)"""
-    if pump_id == 16:
-        return 0
-    elif 1 <= pump_id <= 15:
-        return pump_id
-    else:
-        raise ValueError(f"Invalid pump ID: {pump_id}")
+    return pump_id & 0xF
 
 
 def nibble_to_pump_id(nibble: int) -> int:
     """Convert nibble (1-15, 0) to pump ID (1-16)"""
-    if nibble == 0:
-        return 16
-    elif 1 <= nibble <= 15:
-        return nibble
-    else:
-        raise ValueError(f"Invalid pump nibble: {nibble}")
+    return nibble or 16
+
+
+# CMD_STATUS is 0x0, so each status command byte is just the pump nibble.
+# Indexed by pump ID (1-16); index 0 is unused.
+_STATUS_CMDS = tuple(bytes((pump_id & 0xF,)) for pump_id in range(17))
 
 
 def build_status_command(pump_id: int) -> bytes:
     """Build status poll command: '0' '<p>'"""
-    pump_nibble = pump_id_to_nibble(pump_id)
-    command = (CMD_STATUS << 4) | pump_nibble
-    return bytes([command])
-
+    if not 1 <= pump_id <= 16:
+        raise ValueError(f"Invalid pump ID: {pump_id}")
+    return _STATUS_CMDS[pump_id]
 
-def parse_status_response(response: bytes) -> Tuple[int, int]:
-    """Parse status response to get pump ID and status"""
-    if len(response) != 1:
-        raise ValueError("Invalid status response length")
 
-    word = response[0]
+def parse_status_response(word: int) -> Tuple[int, int]:
+    """Parse status response word to get pump ID and status"""
     status = (word >> 4) & 0xF
     pump_nibble = word & 0xF
-    pump_id = nibble_to_pump_id(pump_nibble)
-
-    return pump_id, status
+    return nibble_to_pump_id(pump_nibble), status
 
 
 def status_code_to_enum(status_code: int) -> PumpStatus:
     """Convert status code to PumpStatus enum"""
-    status_map = {
-        0x0: PumpStatus.DATA_ERROR,
-        0x6: PumpStatus.OFF,
-        0x7: PumpStatus.CALL,
-        0x8: PumpStatus.AUTHORIZED,
-        0x9: PumpStatus.BUSY,
-        0xA: PumpStatus.PEOT,
-        0xB: PumpStatus.FEOT,
-        0xC: PumpStatus.STOP,
-    }
-    return status_map.get(status_code, PumpStatus.OFFLINE)
+    return _STATUS_LUT[status_code & 0xF]
 
 
 def format_hex_bytes(data: bytes) -> str:
     """Format bytes as hex string for logging"""
-    return " ".join(f"{b:02X}" for b in data)
+    return data.hex(" ").upper()
+
+
+def scan_pipelined(ser: serial.Serial, logger: logging.Logger) -> list:
+    """Poll the whole address range with one write and one read"""
+    addresses = range(ADDRESS_RANGE[0], ADDRESS_RANGE[1] + 1)
+    commands = b"".join(_STATUS_CMDS[address] for address in addresses)
+
+    logger.info(f"Sending {len(addresses)} status commands in one batch...")
+    ser.write(commands)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("TX: %s", format_hex_bytes(commands))
+
+    # Each reply carries its own pump nibble, so replies can be matched
+    # regardless of which pumps stayed silent
+    responses = ser.read(len(addresses))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("RX: %s", format_hex_bytes(responses))
+
+    discovered_pumps = []
+    for word in responses:
+        response_pump_id, status_code = parse_status_response(word)
+        status = status_code_to_enum(status_code)
+        logger.info(
+            f"✓ Pump {response_pump_id}: 0x{status_code:X} ({STATUS_CODES[status_code & 0xF]})"
+        )
+
+        if response_pump_id in addresses and status != PumpStatus.OFFLINE:
+            discovered_pumps.append(
+                {
+                    "address": response_pump_id,
+                    "status": status,
+                    "status_code": status_code,
+                    "response_raw": bytes((word,)),
+                }
+            )
+
+    ser.read(ser.in_waiting)  # drain stray bytes, no-op when none are pending
+    return discovered_pumps
 
 
 def main():
@@ -133,7 +200,11 @@ def main():
             parity=serial.PARITY_EVEN,
             stopbits=serial.STOPBITS_ONE,
             timeout=TIMEOUT,
+            write_timeout=WRITE_TIMEOUT,
+            inter_byte_timeout=INTER_BYTE_TIMEOUT,
         )
+        if hasattr(ser, "set_buffer_size"):  # Windows only
+            ser.set_buffer_size(rx_size=64, tx_size=64)
         logger.info(f"✓ Successfully opened {COM_PORT}")
         logger.info(
             f"  Port settings: {ser.baudrate} baud, {ser.bytesize} data bits, {ser.parity} parity, {ser.stopbits} stop bits"
@@ -146,71 +217,78 @@ def main():
     discovered_pumps = []
 
     try:
-        for pump_address in range(ADDRESS_RANGE[0], ADDRESS_RANGE[1] + 1):
-            logger.info(f"\n--- Testing Pump Address {pump_address} ---")
-
-            command = build_status_command(pump_address)
-            logger.info(f"Built status command: 0x{format_hex_bytes(command)}")
-            logger.debug(
-                f"Command breakdown: CMD=0x{CMD_STATUS:X} (STATUS), PUMP_ID={pump_address}"
-            )
-
-            logger.info(f"Sending status command to pump {pump_address}...")
-            ser.write(command)
-            ser.flush()
-            logger.debug(f"TX: {format_hex_bytes(command)}")
-
-            time.sleep(0.1)  # Small delay as per protocol
-
-            try:
-                response = ser.read(1)  # Expect 1 byte response
-
-                if response:
-                    logger.debug(f"RX: {format_hex_bytes(response)}")
-
-                    try:
-                        response_pump_id, status_code = parse_status_response(response)
-                        status = status_code_to_enum(status_code)
-
-                        logger.info(f"✓ Response received from pump {response_pump_id}")
-                        logger.info(
-                            f"  Status Code: 0x{status_code:X} ({STATUS_CODES.get(status_code, 'UNKNOWN')})"
-                        )
-                        logger.info(f"  Status: {status.value}")
-
-                        if response_pump_id == pump_address:
-                            logger.info(f"✓ Pump ID matches request")
-                            if status != PumpStatus.OFFLINE:
-                                discovered_pumps.append(
-                                    {
-                                        "address": pump_address,
-                                        "status": status,
-                                        "status_code": status_code,
-                                        "response_raw": response,
-                                    }
-                                )
-                                logger.info(
-                                    f"✓ Pump {pump_address} added to discovered list"
-                                )
-                            else:
-                                logger.info(f"  Pump {pump_address} is offline")
-                        else:
-                            logger.warning(
-                                f"⚠ Pump ID mismatch: expected {pump_address}, got {response_pump_id}"
+        if PIPELINED_POLL:
+            discovered_pumps = scan_pipelined(ser, logger)
+        else:
+            for pump_address in range(ADDRESS_RANGE[0], ADDRESS_RANGE[1] + 1):
+                logger.info(f"\n--- Testing Pump Address {pump_address} ---")
+
+                command = _STATUS_CMDS[pump_address]
+                logger.info(f"Built status command: 0x{format_hex_bytes(command)}")
+                logger.debug(
+                    "Command breakdown: CMD=0x%X (STATUS), PUMP_ID=%s",
+                    CMD_STATUS,
+                    pump_address,
+                )
+
+                logger.info(f"Sending status command to pump {pump_address}...")
+                ser.write(command)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("TX: %s", format_hex_bytes(command))
+
+                time.sleep(0.1)  # Small delay as per protocol
+
+                try:
+                    response = ser.read(1)  # Expect 1 byte response
+
+                    if response:
+                        word = response[0]
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("RX: %02X", word)
+
+                        try:
+                            response_pump_id, status_code = parse_status_response(word)
+                            status = status_code_to_enum(status_code)
+
+                            logger.info(f"✓ Response received from pump {response_pump_id}")
+                            logger.info(
+                                f"  Status Code: 0x{status_code:X} ({STATUS_CODES[status_code & 0xF]})"
                             )
+                            logger.info(f"  Status: {status.value}")
+
+                            if response_pump_id == pump_address:
+                                logger.info(f"✓ Pump ID matches request")
+                                if status != PumpStatus.OFFLINE:
+                                    discovered_pumps.append(
+                                        {
+                                            "address": pump_address,
+                                            "status": status,
+                                            "status_code": status_code,
+                                            "response_raw": response,
+                                        }
+                                    )
+                                    logger.info(
+                                        f"✓ Pump {pump_address} added to discovered list"
+                                    )
+                                else:
+                                    logger.info(f"  Pump {pump_address} is offline")
+                            else:
+                                logger.warning(
+                                    f"⚠ Pump ID mismatch: expected {pump_address}, got {response_pump_id}"
+                                )
 
-                    except Exception as e:
-                        logger.error(f"✗ Failed to parse response: {e}")
-                        logger.error(f"  Raw response: {format_hex_bytes(response)}")
+                        except Exception as e:
+                            logger.error(f"✗ Failed to parse response: {e}")
+                            logger.error(f"  Raw response: {word:02X}")
 
-                else:
-                    logger.info(f"  No response from pump {pump_address}")
+                    else:
+                        logger.info(f"  No response from pump {pump_address}")
 
-            except Exception as e:
-                logger.error(f"✗ Error reading response: {e}")
+                except Exception as e:
+                    logger.error(f"✗ Error reading response: {e}")
 
-            ser.reset_input_buffer()
-            time.sleep(0.05)
+                ser.read(ser.in_waiting)  # drain stray bytes, no-op when none are pending
+                time.sleep(0.05)
 
     finally:
         logger.info(f"\nClosing serial port...")
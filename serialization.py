@@ -0,0 +1,40 @@
+# serialization.py - JSON rendering shared by the HTTP API
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def orjson_default(obj: Any) -> Any:
+    """orjson fallback for values it cannot encode natively"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, Decimal):
+        # Same mapping as jsonable_encoder: integral values stay ints
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class PumpORJSONResponse(ORJSONResponse):
+    """
+    ORJSONResponse that also accepts pydantic models as content.
+
+    Handlers that return an instance of this class skip FastAPI's
+    response-model validation and jsonable_encoder pass; the route's
+    response_model is still used for the OpenAPI schema. Models nested
+    in dicts/lists are dumped by orjson_default in the same orjson pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode()
+        # Only plain data reaches this branch (e.g. PumpManager results such as
+        # get_pump_list()); OPT_NON_STR_KEYS stringifies int keys in those dicts
+        # the way the stdlib json encoder did
+        return orjson.dumps(
+            content,
+            default=orjson_default,
+            option=orjson.OPT_NON_STR_KEYS,
+        )
@@ -1,25 +1,65 @@
 # ws_pumps.py
 import asyncio, logging
 from datetime import datetime, timezone
-from typing import Dict, Union, Optional
+from typing import Any, Dict, Optional, Tuple, Union
 
+import orjson
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from fastapi.encoders import jsonable_encoder
 from models import PumpStatus
+from port_locks import pump_port
+from serialization import PumpORJSONResponse, orjson_default
 from trash import get_frame
 
 
-router = APIRouter()
+# Matches the app default, so HTTP routes added here render with orjson too
+router = APIRouter(default_response_class=PumpORJSONResponse)
 TICK = 0.5
+HEARTBEAT = 5.0  # unchanged frames are still re-sent this often (seconds)
+SEND_QUEUE_SIZE = 8  # frames buffered per client before the oldest is dropped
 
 # Fix logger configuration
 log = logging.getLogger("ws_pumps")
 log.setLevel(logging.ERROR)
 
-# кеши
-meta: Dict[int, dict] = {}  # price_per_unit / grade
-last_live: Dict[int, float] = {}  # последнее валидное LIVE-число
-last_tx: Dict[int, dict] = {}  # финальный чек для IDLE
+
+# ───────── кеши ─────────
+class PumpCache:
+    """State kept for one pump between ticks"""
+
+    __slots__ = ("price_per_unit", "price_x10", "grade", "last_live", "last_tx")
+
+    def __init__(self):
+        self.price_per_unit: Union[int, float, None] = None
+        self.price_x10: Union[int, float, None] = None  # scaled once, on write
+        self.grade: Optional[int] = None
+        self.last_live: Optional[float] = None  # последнее валидное LIVE-число
+        self.last_tx: Optional[dict] = None  # финальный чек для IDLE
+
+    def set_price(self, price_per_unit: Union[int, float, None], grade: Optional[int]):
+        self.price_per_unit = price_per_unit
+        self.price_x10 = price_per_unit * 10 if price_per_unit else None
+        self.grade = grade
+
+
+cache: Dict[int, PumpCache] = {}
+
+# What reads from the PumpManager can raise: serial errors are OSErrors, and
+# the protocol parser raises ValueError/TypeError on malformed replies
+_PUMP_READ_ERRORS = (AttributeError, KeyError, OSError, TypeError, ValueError)
+
+# Statuses the frame builder branches on
+_DISPENSING = PumpStatus.DISPENSING
+_SETTLED = (PumpStatus.COMPLETE, PumpStatus.IDLE)
+
+# PumpStatusResponse fields sent to the frontend for every pump
+_PUMP_FIELDS = (
+    "pump_id",
+    "status",
+    "last_updated",
+    "error_message",
+    "raw_status_code",
+    "wire_format",
+)
 
 
 # ───────── price-fix ─────────
@@ -28,146 +68,258 @@ def fix_price(ppu: Union[int, float, None]) -> Union[int, float, None]:
         return ppu
     p = int(round(ppu))
     # 4-значные цены Gilbarco возвращает как 5-значные (8150 → 81500)
-    if p > 9999 and p % 10 == 0 and 1000 <= p // 10 <= 9999:
-        return p // 10
+    # p in 10000..99999 already implies 1000 <= p // 10 <= 9999
+    p10 = p // 10
+    if 9999 < p < 100000 and p == p10 * 10:
+        return p10
     return p
 
 
+def _dumps(obj) -> bytes:
+    return orjson.dumps(obj, default=orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _encode_frame(frame: Dict[str, Any]) -> Tuple[bytes, str]:
+    """Return (signature, encoded frame) for a {"ts", "pumps"} frame
+
+    The signature is the frame's content without the two fields stamped
+    with the tick time: top-level "ts" and each pump's "realtime.timestamp".
+    Every other field, timestamps included, is real data and counts.
+    """
+    pumps = frame["pumps"]
+    pumps_json = _dumps(pumps)
+    if any("realtime" in pump for pump in pumps):
+        sig = _dumps(
+            [
+                {**pump, "realtime": {**pump["realtime"], "timestamp": None}}
+                if "realtime" in pump
+                else pump
+                for pump in pumps
+            ]
+        )
+    else:
+        sig = pumps_json
+    # Spliced rather than re-encoded, so the pumps are only dumped once
+    msg = b'{"ts":' + _dumps(frame["ts"]) + b',"pumps":' + pumps_json + b"}"
+    return sig, msg.decode()
+
+
 # ───────── Hub ─────────
 class Hub:
     def __init__(self):
-        self.clients: list[WebSocket] = []
+        self.clients: set[WebSocket] = set()
+        self._last_sig: Optional[bytes] = None
+        self._last_msg: Optional[str] = None
+        self._last_sent = float("-inf")
 
     async def connect(self, ws):
         await ws.accept()
-        self.clients.append(ws)
+        # Each client gets its own outbox and writer, so a slow peer only
+        # backs up its own queue instead of stalling the broadcaster
+        ws.state.send_queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        if self._last_msg is not None:
+            # Unchanged frames are not re-broadcast, so start from the current one
+            ws.state.send_queue.put_nowait(self._last_msg)
+        ws.state.writer = asyncio.create_task(self._writer(ws))
+        self.clients.add(ws)
 
     def disconnect(self, ws):
-        self.clients[:] = [c for c in self.clients if c is not ws]
+        self.clients.discard(ws)
+        writer = getattr(ws.state, "writer", None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
 
-    async def broadcast(self, payload):
-        msg = jsonable_encoder(payload)
-        disconnected_clients = []
-        
-        for ws in self.clients.copy():
-            try:
-                await ws.send_json(msg)
-            except (WebSocketDisconnect, ConnectionResetError, RuntimeError, Exception) as e:
-                log.debug(f"WebSocket error during broadcast: {e}")
-                disconnected_clients.append(ws)
-        
-        # Remove disconnected clients
-        for ws in disconnected_clients:
+    async def _writer(self, ws):
+        queue = ws.state.send_queue
+        try:
+            while True:
+                msg = await queue.get()
+                # Frames are full snapshots, so a backlog is only worth its newest
+                while not queue.empty():
+                    msg = queue.get_nowait()
+                await ws.send_text(msg)
+        # Closed peers surface as WebSocketDisconnect, OSError (incl. connection
+        # resets) or Starlette's RuntimeError for sends after close
+        except (WebSocketDisconnect, OSError, RuntimeError) as e:
+            log.debug("WebSocket error during broadcast: %s", e)
+        finally:
             self.disconnect(ws)
 
+    async def broadcast(self, frame):
+        # Encoded once per broadcast; every client gets the same text frame
+        sig, msg = _encode_frame(frame)
+        now = asyncio.get_running_loop().time()
+        if sig == self._last_sig and now - self._last_sent < HEARTBEAT:
+            return  # only the tick time changed; the heartbeat will refresh it
+        self._last_sig, self._last_msg, self._last_sent = sig, msg, now
+
+        # Nothing below awaits or removes clients, so the set can be iterated as is
+        for ws in self.clients:
+            queue = ws.state.send_queue
+            if queue.full():
+                # Client is SEND_QUEUE_SIZE frames behind; drop the oldest
+                queue.get_nowait()
+                log.debug("Send queue full, dropping frame for %s", ws.client)
+            queue.put_nowait(msg)
+
 
 hub = Hub()
 
 
+# ───────── Frame ─────────
+def _read_pump(pm, pid: int, now_ts: datetime) -> Optional[Dict[str, Any]]:
+    """Build one pump's frame entry, or None if its status can't be read"""
+    # A pump whose status can't be read, for whatever reason, is left out
+    # of this frame only; the other pumps are still broadcast
+    try:
+        st = pm.get_pump_status(pid)
+    except Exception as e:
+        log.error("Error getting status for pump %s: %s", pid, e)
+        return None
+    if st is None:
+        return None
+
+    try:
+        item = {field: getattr(st, field) for field in _PUMP_FIELDS}
+        c = cache.get(pid)
+        if c is None:
+            c = cache[pid] = PumpCache()
+
+        # 2️⃣ Если price/grade ещё не знаем — пробуем один раз взять чек (4p)
+        if c.price_per_unit is None:
+            try:
+                tx = pm.get_transaction_data(pid)
+                if tx and tx.price_per_unit:
+                    c.set_price(fix_price(tx.price_per_unit), tx.grade)
+            except _PUMP_READ_ERRORS as e:
+                log.debug("meta read pump %s: %s", pid, e)
+
+        # ───── DISPENSING ─────
+        # == rather than is: PumpStatus is a str Enum, so this also matches
+        # managers that report status as its plain string value
+        status = st.status
+        if status == _DISPENSING:
+            # 1️⃣ Читаем live-число (деньги ИЛИ литры)
+            try:
+                live_val: Optional[float] = pm.get_realtime(pid)
+                if live_val is not None:
+                    c.last_live = live_val
+            except _PUMP_READ_ERRORS as e:
+                log.debug("Error getting realtime for pump %s: %s", pid, e)
+
+            price = c.price_x10
+            live = c.last_live
+
+            rt = {
+                "price_per_unit": price,
+                "grade": c.grade,
+                "timestamp": now_ts,
+                "total_amount": None,
+                "volume": None,
+            }
+
+            if price and price > 0 and live is not None:  # Safe division
+                rt["total_amount"] = round(live, 2) * 1000
+                rt["volume"] = round(rt["total_amount"] / price, 3)
+            elif live is not None:  # пока не знаем цену → treat as volume
+                rt["volume"] = round(live, 3)
+
+            item["realtime"] = rt
+
+            # новая продажа (live обнулился) → сбрасываем финальный чек
+            if live == 0:
+                c.last_tx = None
+
+        # ───── COMPLETE ─────
+        elif status in _SETTLED:
+            try:
+                tx = pm.get_transaction_data(pid)
+                if tx:
+                    txd = tx.model_dump()
+                    txd["price_per_unit"] = fix_price(txd["price_per_unit"])
+                    item["transaction"] = txd
+                    c.last_tx = txd
+                    c.set_price(txd["price_per_unit"], txd["grade"])
+            except _PUMP_READ_ERRORS as e:
+                log.debug("complete read pump %s: %s", pid, e)
+
+        return item
+
+    except Exception as e:
+        log.error("Error processing pump %s: %s", pid, e)
+        return None
+
+
+def _build_pump_frame(pm, now_ts: datetime) -> Dict[str, Any]:
+    """Read every pump from the PumpManager; blocking, run in a worker thread"""
+    pumps = []
+    for pid in tuple(pm.pumps):
+        # Each pump is read under its port's lock so the polls can't interleave
+        # with price downloads or commands on the same half-duplex line
+        with pump_port(pm, pid):
+            item = _read_pump(pm, pid, now_ts)
+        if item is not None:
+            pumps.append(item)
+    return {"ts": now_ts, "pumps": pumps}
+
+
+# ───────── Producer ─────────
+_producer: Optional[asyncio.Task] = None
+
+
+async def _produce(pm):
+    """Build one frame per tick and broadcast it while any client is connected"""
+    # One timestamp per tick, shared by the frame and every pump entry;
+    # orjson writes the same ISO 8601 text isoformat() would
+    now, utc = datetime.now, timezone.utc
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
+
+    while hub.clients:
+        # Wait for the next tick boundary so processing time doesn't drift
+        # the cadence; after a stall, re-anchor instead of bursting
+        delay = next_tick - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            await asyncio.sleep(0)
+            next_tick = loop.time()
+        next_tick += TICK
+
+        try:
+            if pm:
+                # PumpManager reads may block on serial I/O
+                frame = await asyncio.to_thread(_build_pump_frame, pm, now(utc))
+            else:
+                # ----- FRONTEND TEST ONLY ----- (no PumpManager running)
+                frame = get_frame()
+            await hub.broadcast(frame)
+        except Exception as e:  # keep ticking whatever one tick raised
+            log.error("Error in WebSocket producer loop: %s", e)
+
+
+def _ensure_producer(pm) -> None:
+    # The producer exits once the last client leaves and restarts with the next
+    global _producer
+    if _producer is None or _producer.done():
+        _producer = asyncio.create_task(_produce(pm))
+
+
 # ───────── WebSocket ─────────
 @router.websocket("/ws/pumps")
 async def pumps_socket(ws: WebSocket):
     await hub.connect(ws)
-    # pm = ws.app.state.pump_manager  # общий PumpManager
+    _ensure_producer(getattr(ws.app.state, "pump_manager", None))  # общий PumpManager
 
     try:
+        # Frames are pushed by the shared producer; reading here only notices
+        # the client going away, so closed sockets leave the hub promptly
         while True:
-            try:
-                frame = {"ts": datetime.now(timezone.utc).isoformat(), "pumps": []}
-
-                # Safely get pump statuses
-                pump_statuses = {}
-                try:
-                    pump_statuses = {}
-                except Exception as e:
-                    log.error(f"Error getting pump statuses: {e}")
-                    await asyncio.sleep(TICK)
-                    continue
-
-                for pid, st in pump_statuses.items():
-                    try:
-                        item = st.dict()
-
-                        # 2️⃣ Если price/grade ещё не знаем — пробуем один раз взять чек (4p)
-                        if pid not in meta:
-                            try:
-                                tx = {}
-                                if tx and tx.price_per_unit:
-                                    meta[pid] = {
-                                        "price_per_unit": fix_price(tx.price_per_unit),
-                                        "grade": tx.grade,
-                                    }
-                            except Exception as e:
-                                log.debug("meta read pump %s: %s", pid, e)
-
-                        # ───── DISPENSING ─────
-                        if st.status == PumpStatus.DISPENSING:
-                            # 1️⃣ Читаем live-число (деньги ИЛИ литры)
-                            try:
-                                live_val: Optional[float] = pm.get_realtime(pid)
-                                if live_val is not None:
-                                    last_live[pid] = live_val
-                            except Exception as e:
-                                log.debug(f"Error getting realtime for pump {pid}: {e}")
-
-                            # Safe price calculation
-                            price_per_unit = meta.get(pid, {}).get("price_per_unit")
-                            price = (price_per_unit * 10) if price_per_unit else None
-                            
-                            rt = {
-                                "price_per_unit": price,
-                                "grade": meta.get(pid, {}).get("grade"),
-                                "timestamp": datetime.now(timezone.utc).isoformat(),
-                                "total_amount": None,
-                                "volume": None,
-                            }
-
-                            if price and price > 0 and pid in last_live:  # Safe division
-                                rt["total_amount"] = round(last_live[pid], 2) * 1000
-                                rt["volume"] = round(rt["total_amount"] / price, 3)
-                            elif pid in last_live:  # пока не знаем цену → treat as volume
-                                rt["volume"] = round(last_live[pid], 3)
-
-                            item["realtime"] = rt
-
-                            # новая продажа (live обнулился) → сбрасываем финальный чек
-                            if pid in last_live and last_live[pid] == 0:
-                                last_tx.pop(pid, None)
-
-                        # ───── COMPLETE ─────
-                        elif st.status == PumpStatus.COMPLETE or st.status == PumpStatus.IDLE:
-                            try:
-                                tx = {}
-                                if tx:
-                                    txd = tx.dict()
-                                    txd["price_per_unit"] = fix_price(txd["price_per_unit"])
-                                    item["transaction"] = txd
-                                    last_tx[pid] = txd
-                                    meta[pid] = {
-                                        "price_per_unit": txd["price_per_unit"],
-                                        "grade": txd["grade"],
-                                    }
-                            except Exception as e:
-                                log.debug("complete read pump %s: %s", pid, e)
-
-                        frame["pumps"].append(item)
-                        
-                    except Exception as e:
-                        log.error(f"Error processing pump {pid}: {e}")
-                        continue
-                    
-                # ----- FRONTEND TEST ONLY -----
-                # await hub.broadcast(frame)
-                await hub.broadcast(get_frame())
-                
-            except Exception as e:
-                log.error(f"Error in WebSocket main loop: {e}")
-                
-            await asyncio.sleep(TICK)
-
-    except WebSocketDisconnect:
-        log.info("WebSocket client disconnected")
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                log.info("WebSocket client disconnected")
+                break
     except Exception as e:
-        log.error(f"Unexpected error in WebSocket: {e}")
+        log.error("Unexpected error in WebSocket: %s", e)
     finally:
         hub.disconnect(ws)